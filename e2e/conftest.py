@@ -1,5 +1,9 @@
+import collections
+import http.client
+import importlib.util
 import json
 import os
+import select
 import signal
 import socket
 import subprocess
@@ -8,15 +12,31 @@ import time
 import urllib.error
 import urllib.request
 import tempfile
-import uuid
+import threading
 
 import pytest
 
 
+# Ports handed out by _pick_free_port during this session; never reused.
+_issued_ports = set()
+
+
 def _pick_free_port() -> int:
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        s.bind(("127.0.0.1", 0))
-        return int(s.getsockname()[1])
+    """Pick-then-close fallback for Windows, where a socket fd can't be handed to uvicorn."""
+    while True:
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            s.bind(("127.0.0.1", 0))
+            port = int(s.getsockname()[1])
+        if port not in _issued_ports:
+            _issued_ports.add(port)
+            return port
+
+
+def _bind_listen_socket() -> socket.socket:
+    """Bind an ephemeral loopback port and keep it, so nobody can grab it before uvicorn."""
+    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    s.bind(("127.0.0.1", 0))
+    return s
 
 
 def _http_get_json(url: str, timeout_s: float = 2.0):
@@ -26,22 +46,101 @@ def _http_get_json(url: str, timeout_s: float = 2.0):
         return resp.status, resp.headers, json.loads(body)
 
 
-def _wait_until_healthy(base_url: str, timeout_s: float = 30.0) -> None:
+class _KeepAliveClient:
+    """One persistent HTTP/1.1 connection to the e2e server, shared by all tests."""
+
+    def __init__(self, host: str, port: int, timeout_s: float = 10.0):
+        self._conn = http.client.HTTPConnection(host, port, timeout=timeout_s)
+
+    def request(self, method: str, path: str, *, body: bytes = None, headers: dict = None):
+        """Returns (status, headers, body). Reconnects once if uvicorn dropped the idle socket."""
+        for attempt in range(2):
+            try:
+                self._conn.request(method, path, body=body, headers=headers or {})
+                resp = self._conn.getresponse()
+                return resp.status, resp.headers, resp.read()
+            except (http.client.RemoteDisconnected, http.client.CannotSendRequest, ConnectionError):
+                self._conn.close()
+                if attempt:
+                    raise
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class _InProcessClient:
+    """Same `request()` shape as _KeepAliveClient, but calls the ASGI app in-process."""
+
+    def __init__(self, client):
+        self._client = client
+
+    def request(self, method: str, path: str, *, body: bytes = None, headers: dict = None):
+        resp = self._client.request(method, path, content=body, headers=headers)
+        return resp.status_code, resp.headers, resp.content
+
+
+def _port_open(port: int) -> bool:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.settimeout(0.05)
+        return s.connect_ex(("127.0.0.1", port)) == 0
+
+
+def _wait_until_healthy(base_url: str, port: int, timeout_s: float = 30.0) -> None:
     deadline = time.time() + timeout_s
     last_err = None
+    delay = 0.01
 
     while time.time() < deadline:
-        try:
-            status, _headers, payload = _http_get_json(f"{base_url}/health", timeout_s=2.0)
-            if status == 200 and payload.get("ok") is True:
-                return
-        except Exception as e:
-            last_err = e
-            time.sleep(0.2)
+        # Cheap TCP probe first; only hit /health once uvicorn is listening.
+        if _port_open(port):
+            try:
+                status, _headers, payload = _http_get_json(f"{base_url}/health", timeout_s=2.0)
+                if status == 200 and payload.get("ok") is True:
+                    return
+            except Exception as e:
+                last_err = e
+        time.sleep(delay)
+        delay = min(delay * 2, 0.2)
 
     raise RuntimeError(f"API did not become healthy within {timeout_s}s. Last error: {last_err!r}")
 
 
+def _drain_output(stream, sink: collections.deque) -> None:
+    """Keep reading the server's output so a full pipe never blocks uvicorn."""
+    for line in iter(stream.readline, ""):
+        sink.append(line)
+
+
+def _wait_pidfd(proc: subprocess.Popen, timeout_s: float) -> bool:
+    """Wait for `proc` to exit; returns False if it is still running after `timeout_s`.
+
+    On Linux >= 5.3 this blocks on a pidfd instead of letting subprocess poll
+    waitpid() in a sleep loop. Elsewhere it falls back to `proc.wait`.
+    """
+    fd = None
+    if hasattr(os, "pidfd_open"):
+        try:
+            fd = os.pidfd_open(proc.pid)
+        except OSError:
+            fd = None  # already reaped, or kernel without pidfd support
+
+    if fd is None:
+        try:
+            proc.wait(timeout=timeout_s)
+            return True
+        except subprocess.TimeoutExpired:
+            return False
+
+    try:
+        ready, _, _ = select.select([fd], [], [], timeout_s)
+    finally:
+        os.close(fd)
+    if ready:
+        proc.wait()
+        return True
+    return False
+
+
 @pytest.fixture(scope="session")
 def api_base_url():
     """Starts the real API with uvicorn and yields its base URL (HTTP)."""
@@ -50,7 +149,18 @@ def api_base_url():
     except Exception:
         pytest.skip("uvicorn is required for e2e tests (pip install uvicorn)")
 
-    port = _pick_free_port()
+    # On POSIX the bound socket itself is passed to uvicorn (--fd), which closes
+    # the window between picking a port and uvicorn binding it.
+    listen_sock = None
+    if os.name == "nt":
+        port = _pick_free_port()
+        bind_args = ["--host", "127.0.0.1", "--port", str(port)]
+        pass_fds = ()
+    else:
+        listen_sock = _bind_listen_socket()
+        port = int(listen_sock.getsockname()[1])
+        bind_args = ["--fd", str(listen_sock.fileno())]
+        pass_fds = (listen_sock.fileno(),)
     base_url = f"http://127.0.0.1:{port}"
 
     # Ensure repo root is on PYTHONPATH so `v1.server.app:app` imports reliably.
@@ -59,28 +169,38 @@ def api_base_url():
     env["PYTHONPATH"] = repo_root + (os.pathsep + env["PYTHONPATH"] if env.get("PYTHONPATH") else "")
     env.setdefault("MOBYPARK_SKIP_SEED", "1")
     env.setdefault("MOBYPARK_DISABLE_ELASTIC_LOGS", "1")
-    env.setdefault(
-        "MOBYPARK_DB_PATH",
-        os.path.join(tempfile.gettempdir(), f"mobipark_e2e_{uuid.uuid4().hex}.db"),
-    )
 
-    cmd = [
-        sys.executable,
+    # Persist the server's bytecode outside the repo so later runs (and CI caches
+    # of the temp dir) skip recompiling v1/. Any non-empty PYTHONDONTWRITEBYTECODE
+    # (even "0") disables writing, so drop it for the subprocess.
+    env.setdefault("PYTHONPYCACHEPREFIX", os.path.join(tempfile.gettempdir(), "mobypark-pyc"))
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+
+    # One throwaway DB for the whole session; removed again on teardown.
+    tmp_dir = tempfile.TemporaryDirectory(prefix="mobipark_e2e_")
+    env.setdefault("MOBYPARK_DB_PATH", os.path.join(tmp_dir.name, "MobyPark.e2e.db"))
+
+    cmd = [sys.executable]
+    # MOBYPARK_E2E_IMPORTTIME=1 prints uvicorn's import profile (-X importtime).
+    if os.getenv("MOBYPARK_E2E_IMPORTTIME"):
+        cmd += ["-X", "importtime"]
+    cmd += [
         "-m",
         "uvicorn",
         "v1.server.app:app",
-        "--host",
-        "127.0.0.1",
-        "--port",
-        str(port),
+        *bind_args,
         "--log-level",
         "warning",
     ]
+    # Faster event loop / HTTP parser when the wheels are installed (POSIX only
+    # for uvloop); otherwise uvicorn keeps its asyncio + h11 defaults.
+    if importlib.util.find_spec("uvloop") and importlib.util.find_spec("httptools"):
+        cmd += ["--loop", "uvloop", "--http", "httptools"]
 
-    # On Windows, `CREATE_NEW_PROCESS_GROUP` lets us send CTRL_BREAK_EVENT if needed.
-    creationflags = 0
-    if os.name == "nt":
-        creationflags = subprocess.CREATE_NEW_PROCESS_GROUP  # type: ignore[attr-defined]
+    # Own process group on both platforms, so teardown can signal uvicorn and any
+    # children it spawned in one go (CTRL_BREAK_EVENT on Windows, killpg on POSIX).
+    posix = os.name != "nt"
+    creationflags = 0 if posix else subprocess.CREATE_NEW_PROCESS_GROUP  # type: ignore[attr-defined]
 
     proc = subprocess.Popen(
         cmd,
@@ -90,31 +210,80 @@ def api_base_url():
         stderr=subprocess.STDOUT,
         text=True,
         creationflags=creationflags,
+        start_new_session=posix,
+        pass_fds=pass_fds,
     )
+    if listen_sock is not None:
+        listen_sock.close()  # uvicorn holds its own copy now
+
+    output_tail = collections.deque(maxlen=2000)
+    drain = threading.Thread(target=_drain_output, args=(proc.stdout, output_tail), daemon=True)
+    drain.start()
 
     try:
-        _wait_until_healthy(base_url, timeout_s=45.0)
+        _wait_until_healthy(base_url, port, timeout_s=45.0)
         yield base_url
     finally:
         if proc.poll() is None:
             try:
-                if os.name == "nt":
-                    proc.send_signal(signal.CTRL_BREAK_EVENT)  # type: ignore[attr-defined]
+                if posix:
+                    os.killpg(proc.pid, signal.SIGTERM)
                 else:
-                    proc.terminate()
-            except Exception:
+                    proc.send_signal(signal.CTRL_BREAK_EVENT)  # type: ignore[attr-defined]
+            except (OSError, ValueError):
                 proc.terminate()
 
-        try:
-            proc.wait(timeout=10)
-        except subprocess.TimeoutExpired:
+        if not _wait_pidfd(proc, 10):
             proc.kill()
+            proc.wait()
 
         # If startup failed, expose logs to help debug.
+        drain.join(timeout=2)
         if proc.returncode not in (0, None):
-            try:
-                output = (proc.stdout.read() if proc.stdout else "")
-            except Exception:
-                output = ""
+            output = "".join(output_tail)
             if output:
                 print("\n--- uvicorn output (e2e) ---\n" + output)
+
+        try:
+            tmp_dir.cleanup()
+        except OSError:
+            pass
+
+
+@pytest.fixture(scope="session")
+def http_client(api_base_url):
+    """Keep-alive client for `api_base_url`; tests pass paths like "/health"."""
+    port = int(api_base_url.rsplit(":", 1)[1])
+    client = _KeepAliveClient("127.0.0.1", port)
+    try:
+        yield client
+    finally:
+        client.close()
+
+
+@pytest.fixture(scope="session")
+def app_client(tmp_path_factory):
+    """Runs the app in this process via Starlette's TestClient (no uvicorn, no TCP).
+
+    For checks that don't depend on a real socket; use `http_client` for the rest.
+    """
+    try:
+        from fastapi.testclient import TestClient
+    except Exception:
+        pytest.skip("fastapi (with httpx) is required for in-process e2e tests")
+
+    repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    if repo_root not in sys.path:
+        sys.path.insert(0, repo_root)
+
+    db_path = str(tmp_path_factory.mktemp("app_client") / "MobyPark.e2e.db")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("MOBYPARK_SKIP_SEED", os.environ.get("MOBYPARK_SKIP_SEED", "1"))
+        mp.setenv("MOBYPARK_DISABLE_ELASTIC_LOGS", os.environ.get("MOBYPARK_DISABLE_ELASTIC_LOGS", "1"))
+        mp.setenv("MOBYPARK_DB_PATH", os.environ.get("MOBYPARK_DB_PATH", db_path))
+
+        from v1.server.app import app
+
+        # Entering the client runs the app lifespan, which creates the schema.
+        with TestClient(app) as client:
+            yield _InProcessClient(client)
@@ -1,63 +1,57 @@
 import json
 import time
-import urllib.error
-import urllib.request
 
+try:
+    import orjson
 
-def _http_get(url: str, timeout_s: float = 5.0):
-    req = urllib.request.Request(url, method="GET")
-    with urllib.request.urlopen(req, timeout=timeout_s) as resp:
-        headers = {k.lower(): v for k, v in dict(resp.headers).items()}
-        return resp.status, headers, resp.read()
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:  # optional speed-up; stdlib json works the same here
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj).encode("utf-8")
 
+    _loads = json.loads
 
-def _http_json(method: str, url: str, *, json_body=None, headers=None, timeout_s: float = 10.0):
+
+# Both clients hand back case-insensitive headers (http.client's HTTPMessage,
+# httpx.Headers), so `headers.get("content-type")` works without copying them.
+def _http_get(client, path: str):
+    return client.request("GET", path)
+
+
+def _http_json(client, method: str, path: str, *, json_body=None, headers=None):
     headers = dict(headers or {})
     data = None
     if json_body is not None:
-        data = json.dumps(json_body).encode("utf-8")
+        data = _dumps(json_body)
         headers.setdefault("Content-Type", "application/json")
-    req = urllib.request.Request(url, method=method, data=data, headers=headers)
 
+    status, resp_headers, body = client.request(method, path, body=data, headers=headers)
     try:
-        with urllib.request.urlopen(req, timeout=timeout_s) as resp:
-            raw_headers = {k.lower(): v for k, v in dict(resp.headers).items()}
-            body = resp.read()
-            payload = json.loads(body.decode("utf-8")) if body else None
-            return resp.status, raw_headers, payload
-    except urllib.error.HTTPError as e:
-        raw_headers = {k.lower(): v for k, v in dict(e.headers).items()}
-        try:
-            body = e.read()
-        except TimeoutError:
-            body = b""
-        try:
-            payload = json.loads(body.decode("utf-8")) if body else None
-        except Exception:
-            payload = body.decode("utf-8", errors="replace") if body else None
-        return int(e.code), raw_headers, payload
-
-
-def test_health_endpoint(api_base_url: str):
-    status, _headers, body = _http_get(f"{api_base_url}/health")
+        payload = _loads(body) if body else None
+    except ValueError:
+        payload = body.decode("utf-8", errors="replace")
+    return status, resp_headers, payload
+
+
+def test_health_endpoint(app_client):
+    status, _headers, body = _http_get(app_client, "/health")
     assert status == 200
 
-    payload = json.loads(body.decode("utf-8"))
+    payload = _loads(body)
     assert payload.get("ok") is True
 
 
-def test_openapi_available(api_base_url: str):
-    status, headers, body = _http_get(f"{api_base_url}/openapi.json")
+def test_openapi_available(app_client):
+    status, headers, payload = _http_json(app_client, "GET", "/openapi.json")
     assert status == 200
     assert "application/json" in headers.get("content-type", "")
-
-    payload = json.loads(body.decode("utf-8"))
     assert payload.get("openapi")
     assert payload.get("info", {}).get("title") == "MobyPark API"
 
 
-def test_root_responds(api_base_url: str):
-    status, headers, body = _http_get(f"{api_base_url}/")
+def test_root_responds(app_client):
+    status, headers, body = _http_get(app_client, "/")
     assert status == 200
 
     # Root may return HTML (static index) or JSON fallback.
@@ -66,7 +60,7 @@ def test_root_responds(api_base_url: str):
     assert len(body) > 0
 
 
-def test_auth_register_login_profile_and_vehicle_flow(api_base_url: str):
+def test_auth_register_login_profile_and_vehicle_flow(app_client):
     # Username must be 8-10 chars and start with a letter/underscore.
     # Use a time-based suffix to avoid collisions across runs.
     suffix = f"{int(time.time() * 1000) % 10_000_000:07d}"
@@ -82,19 +76,20 @@ def test_auth_register_login_profile_and_vehicle_flow(api_base_url: str):
     }
 
     # Register (if a rare collision happens, retry once)
-    status, _headers, payload = _http_json("POST", f"{api_base_url}/auth/register", json_body=user)
+    status, _headers, payload = _http_json(app_client, "POST", "/auth/register", json_body=user)
     if status == 409:
         suffix = f"{(int(time.time() * 1000) + 1) % 10_000_000:07d}"
         username = f"e{suffix}"
         user["username"] = username
         user["email"] = f"{username}@example.com"
-        status, _headers, payload = _http_json("POST", f"{api_base_url}/auth/register", json_body=user)
+        status, _headers, payload = _http_json(app_client, "POST", "/auth/register", json_body=user)
     assert status == 200, payload
 
     # Login
     status, _headers, payload = _http_json(
+        app_client,
         "POST",
-        f"{api_base_url}/auth/login",
+        "/auth/login",
         json_body={"username": user["username"], "password": user["password"]},
     )
     assert status == 200, payload
@@ -103,8 +98,9 @@ def test_auth_register_login_profile_and_vehicle_flow(api_base_url: str):
 
     # Authenticated profile
     status, _headers, payload = _http_json(
+        app_client,
         "GET",
-        f"{api_base_url}/auth/profile",
+        "/auth/profile",
         headers={"Authorization": token},
     )
     assert status == 200, payload
@@ -114,8 +110,9 @@ def test_auth_register_login_profile_and_vehicle_flow(api_base_url: str):
     # Create a vehicle
     plate = f"E2E-{suffix[-4:]}"
     status, _headers, payload = _http_json(
+        app_client,
         "POST",
-        f"{api_base_url}/vehicles",
+        "/vehicles",
         headers={"Authorization": token},
         json_body={
             "license_plate": plate,
@@ -130,8 +127,9 @@ def test_auth_register_login_profile_and_vehicle_flow(api_base_url: str):
 
     # List own vehicles and verify it’s there
     status, _headers, payload = _http_json(
+        app_client,
         "GET",
-        f"{api_base_url}/vehicles",
+        "/vehicles",
         headers={"Authorization": token},
     )
     assert status == 200, payload
@@ -140,21 +138,23 @@ def test_auth_register_login_profile_and_vehicle_flow(api_base_url: str):
 
     # Logout invalidates token
     status, _headers, payload = _http_json(
+        app_client,
         "GET",
-        f"{api_base_url}/auth/logout",
+        "/auth/logout",
         headers={"Authorization": token},
     )
     assert status == 200, payload
 
     status, _headers, payload = _http_json(
+        app_client,
         "GET",
-        f"{api_base_url}/auth/profile",
+        "/auth/profile",
         headers={"Authorization": token},
     )
     assert status == 401
 
 
-def test_admin_can_create_and_delete_parking_lot(api_base_url: str):
+def test_admin_can_create_and_delete_parking_lot(http_client):
     suffix = f"{int(time.time() * 1000) % 10_000_000:07d}"
     username = f"a{suffix}"  # 8 chars total
 
@@ -167,18 +167,19 @@ def test_admin_can_create_and_delete_parking_lot(api_base_url: str):
         "role": "ADMIN",
     }
 
-    status, _headers, payload = _http_json("POST", f"{api_base_url}/auth/register", json_body=admin)
+    status, _headers, payload = _http_json(http_client, "POST", "/auth/register", json_body=admin)
     if status == 409:
         suffix = f"{(int(time.time() * 1000) + 1) % 10_000_000:07d}"
         username = f"a{suffix}"
         admin["username"] = username
         admin["email"] = f"{username}@example.com"
-        status, _headers, payload = _http_json("POST", f"{api_base_url}/auth/register", json_body=admin)
+        status, _headers, payload = _http_json(http_client, "POST", "/auth/register", json_body=admin)
     assert status == 200, payload
 
     status, _headers, payload = _http_json(
+        http_client,
         "POST",
-        f"{api_base_url}/auth/login",
+        "/auth/login",
         json_body={"username": admin["username"], "password": admin["password"]},
     )
     assert status == 200, payload
@@ -197,8 +198,9 @@ def test_admin_can_create_and_delete_parking_lot(api_base_url: str):
         "lng": 4.8952,
     }
     status, _headers, payload = _http_json(
+        http_client,
         "POST",
-        f"{api_base_url}/parking-lots",
+        "/parking-lots",
         headers={"Authorization": token},
         json_body=lot_payload,
     )
@@ -206,19 +208,20 @@ def test_admin_can_create_and_delete_parking_lot(api_base_url: str):
     lot_id = payload["id"]
 
     # Fetch it
-    status, _headers, payload = _http_json("GET", f"{api_base_url}/parking-lots/{lot_id}")
+    status, _headers, payload = _http_json(http_client, "GET", f"/parking-lots/{lot_id}")
     assert status == 200, payload
     assert payload.get("id") == lot_id
     assert payload.get("name") == lot_payload["name"]
 
     # Delete it
     status, _headers, payload = _http_json(
+        http_client,
         "DELETE",
-        f"{api_base_url}/parking-lots/{lot_id}",
+        f"/parking-lots/{lot_id}",
         headers={"Authorization": token},
     )
     assert status == 200, payload
 
     # Verify gone
-    status, _headers, payload = _http_json("GET", f"{api_base_url}/parking-lots/{lot_id}")
+    status, _headers, payload = _http_json(http_client, "GET", f"/parking-lots/{lot_id}")
     assert status == 404
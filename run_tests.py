@@ -6,30 +6,54 @@ Run specific test files:
   python run_tests.py auth         # Run only auth tests
   python run_tests.py vehicles     # Run only vehicle tests
   python run_tests.py parking_lots # Run only parking lot tests
+  python run_tests.py e2e          # Run the end-to-end tests (parallel if pytest-xdist is installed)
+
+Extra arguments are passed on to pytest, e.g.:
+  python run_tests.py auth --lf    # Only re-run the auth tests that failed last time
 """
+import importlib.util
 import pytest
 import sys
 
+_UNIT_SUITES = (
+    "admin",
+    "auth",
+    "database",
+    "extra_route_coverage",
+    "general",
+    "logging",
+    "parking_lots",
+    "payments",
+    "reservations",
+    "session_calculator_unit",
+    "sessions",
+    "vehicles",
+)
+
+TARGETS = {
+    "all": ["v1/tests/"],
+    "e2e": ["e2e/"],
+    **{name: [f"v1/tests/test_{name}.py"] for name in _UNIT_SUITES},
+}
+
+# --ff runs last run's failures first but still runs everything; the cache that
+# backs it (and --lf) stays enabled. -v/-s are left out: per-test output slows
+# pytest down noticeably on the full suite. importlib import mode loads each
+# test module directly instead of rewriting sys.path and re-importing through
+# the rootdir for every package it walks.
+BASE_ARGS = ["-p", "no:randomly", "--import-mode=importlib", "--ff", "--tb=short", "-q"]
+
 if __name__ == "__main__":
-    # Check if specific test file requested
-    if len(sys.argv) > 1:
-        test_name = sys.argv[1]
-        test_path = f"v1/tests/test_{test_name}.py"
-        print(f"Running {test_name} tests...")
-        exit_code = pytest.main([
-            test_path,
-            "-v",
-            "-s",
-            "--tb=short",
-        ])
-    else:
-        # Run all tests
-        print("Running all tests...")
-        exit_code = pytest.main([
-            "v1/tests/",
-            "-v",
-            "-s",
-            "--tb=short",
-        ])
-
-    sys.exit(exit_code)
+    test_name = sys.argv[1] if len(sys.argv) > 1 else "all"
+    if test_name not in TARGETS:
+        print(f"Unknown test suite '{test_name}'. Choose from: {', '.join(TARGETS)}")
+        sys.exit(2)
+
+    args = TARGETS[test_name] + BASE_ARGS + sys.argv[2:]
+    if test_name == "e2e" and importlib.util.find_spec("xdist"):
+        # Every xdist worker boots its own uvicorn + temp DB, so the tests
+        # can be spread individually instead of per file.
+        args += ["-n", "auto", "--dist=load"]
+
+    print(f"Running {test_name} tests...")
+    sys.exit(pytest.main(args))
@@ -1,4 +1,5 @@
 from datetime import datetime, timezone
+from functools import lru_cache
 import re
 import sqlite3
 import os
@@ -14,6 +15,26 @@ _VALID_PAYMENT_STATUSES = {"unpaid", "pending", "paid", "failed"}
 _VALID_STATUSES = {"pending", "confirmed", "cancelled"}
 _VALID_ROLES = {"USER", "ADMIN"}
 
+_ISO_Z_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+@lru_cache(maxsize=8192)
+def _parse_iso_z(ts: str) -> datetime:
+    """
+    Parse a 'YYYY-MM-DDTHH:MM:SSZ' timestamp (raises ValueError otherwise).
+    The fixed 20-char layout goes through the C fromisoformat; anything else
+    falls back to strptime, so the accepted inputs stay the same.
+    """
+    if (
+        len(ts) == 20 and ts[19] == "Z" and ts[10] == "T"
+        and ts[4] == ts[7] == "-" and ts[13] == ts[16] == ":"
+    ):
+        try:
+            return datetime.fromisoformat(ts[:19])
+        except ValueError:
+            pass
+    return datetime.strptime(ts, _ISO_Z_FORMAT)
+
 
 def get_connection(db_path: str = None) -> sqlite3.Connection:
     """
@@ -436,7 +457,7 @@ def insert_reservation(con: sqlite3.Connection, reservation_obj) -> int:
     def _check_iso(ts: str, field: str):
         try:
             if ts.endswith("Z"):
-                datetime.strptime(ts, "%Y-%m-%dT%H:%M:%SZ")
+                _parse_iso_z(ts)
             else:
                 datetime.fromisoformat(ts.replace("Z", "+00:00"))
         except Exception:
@@ -620,7 +641,7 @@ def insert_parking_session(con: sqlite3.Connection, session_obj) -> int:
         try:
             # Accepts forms like '2020-03-25T20:29:47Z' or with offset '+00:00'
             if ts.endswith("Z"):
-                datetime.strptime(ts, "%Y-%m-%dT%H:%M:%SZ")
+                _parse_iso_z(ts)
             else:
                 # very light check; adjust if you want stricter parsing
                 datetime.fromisoformat(ts.replace("Z", "+00:00"))
@@ -708,7 +729,7 @@ def insert_payment(con: sqlite3.Connection, payment_obj) -> int:
         try:
             # already ISO with Z?
             if ts.endswith("Z"):
-                datetime.strptime(ts, "%Y-%m-%dT%H:%M:%SZ")
+                _parse_iso_z(ts)
                 return ts
             # already ISO without Z (or with offset)?
             datetime.fromisoformat(ts.replace("Z", "+00:00"))
@@ -757,7 +778,7 @@ def insert_payment(con: sqlite3.Connection, payment_obj) -> int:
             return
         try:
             if ts.endswith("Z"):
-                datetime.strptime(ts, "%Y-%m-%dT%H:%M:%SZ")
+                _parse_iso_z(ts)
             else:
                 datetime.fromisoformat(ts.replace("Z", "+00:00"))
         except Exception:
@@ -1,32 +1,67 @@
-from datetime import datetime
+from datetime import datetime, timedelta
+from functools import lru_cache
 from .storage_utils import load_payment_data
 from hashlib import md5
-import math
+import re
 import uuid
 
+SESSION_DT_FORMAT = "%d-%m-%Y %H:%M:%S"
+_SESSION_DT_RE = re.compile(r"(\d\d)-(\d\d)-(\d{4}) (\d\d):(\d\d):(\d\d)", re.ASCII)
+_ONE_HOUR = timedelta(hours=1)
+_FREE_PERIOD = timedelta(minutes=3)
+
+
+@lru_cache(maxsize=4096)
+def _parse_dt(value):
+    """Parse a 'DD-MM-YYYY HH:MM:SS' timestamp.
+
+    The fixed layout (ASCII digits only) is read directly; anything else goes
+    through strptime, which raises ValueError for malformed input just like before.
+    """
+    s = value.strip()
+    m = _SESSION_DT_RE.fullmatch(s)
+    if m:
+        day, month, year, hour, minute, second = m.groups()
+        try:
+            return datetime(
+                int(year), int(month), int(day),
+                int(hour), int(minute), int(second),
+            )
+        except ValueError:
+            pass
+    return datetime.strptime(s, SESSION_DT_FORMAT)
+
+
 def calculate_price(pricing, sid, data):
-    price = 0
-    start = datetime.strptime(data["started"], "%d-%m-%Y %H:%M:%S")
+    start = _parse_dt(data["started"])
+    end = _parse_dt(data["stopped"]) if data.get("stopped") else None
+    return calculate_price_dt(pricing, sid, start, end)
 
-    if data.get("stopped"):
-        end = datetime.strptime(data["stopped"], "%d-%m-%Y %H:%M:%S")
-    else:
+
+def calculate_price_dt(pricing, sid, start, end=None):
+    """Price a session from datetime objects; `end=None` means it is still running.
+
+    For callers that already hold datetimes. The billing routes keep using
+    calculate_price: they read `started`/`stopped` as TEXT from the database.
+    """
+    if end is None:
         end = datetime.now()
 
     diff = end - start
-    hours = math.ceil(diff.total_seconds() / 3600)
+    # Ceiling division on the timedelta itself: exact, no float rounding.
+    hours = -(-diff // _ONE_HOUR)
+    days = diff.days + 1 if end.date() > start.date() else 0
 
-    if diff.total_seconds() < 180:
+    if diff < _FREE_PERIOD:
         price = 0
-    elif end.date() > start.date():
-        price = float(pricing.get("daytariff", 999)) * (diff.days + 1)
     else:
-        price = float(pricing.get("tariff")) * hours
-
-        if price > float(pricing.get("daytariff", 999)):
-            price = float(pricing.get("daytariff", 999))
+        daytariff = float(pricing.get("daytariff", 999))
+        if days:
+            price = daytariff * days
+        else:
+            price = min(float(pricing.get("tariff")) * hours, daytariff)
 
-    return (price, hours, diff.days + 1 if end.date() > start.date() else 0)
+    return (price, hours, days)
 
 
 
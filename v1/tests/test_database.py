@@ -151,3 +151,18 @@ class TestDatabaseLogic:
         with pytest.raises(sqlite3.IntegrityError):
             database_logic.insert_user(con, user)  # Duplicate username/email
         con.close()
+
+
+
+@pytest.mark.parametrize("ts", [
+    "2025-12-03T11:00:00Z",
+    "2025-1-3T1:00:00Z",  # strptime accepts single digits
+])
+def test_parse_iso_z_accepts_what_strptime_accepts(ts):
+    assert database_logic._parse_iso_z(ts) == datetime.strptime(ts, "%Y-%m-%dT%H:%M:%SZ")
+
+
+@pytest.mark.parametrize("ts", ["2025-13-03T11:00:00Z", "2025-12-03T11:00:00", "not a date"])
+def test_parse_iso_z_rejects_invalid_timestamps(ts):
+    with pytest.raises(ValueError):
+        database_logic._parse_iso_z(ts)
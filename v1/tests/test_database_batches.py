@@ -0,0 +1,859 @@
+"""
+Tests for the bulk import helpers in database_batches
+"""
+import sqlite3
+from datetime import datetime, timezone
+
+import pytest
+
+from v1.Database import database_batches as db
+from v1.Database.database_creation import create_database
+
+
+@pytest.fixture
+def conn():
+    con = sqlite3.connect(":memory:")
+    con.execute("PRAGMA foreign_keys = ON;")
+    con.execute("""
+    CREATE TABLE items (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        code TEXT NOT NULL UNIQUE,
+        parent_id INTEGER REFERENCES items(id)
+    );
+    """)
+    con.commit()
+    yield con
+    con.close()
+
+
+SQL_INSERT_ITEMS = "INSERT OR IGNORE INTO items (code, parent_id) VALUES (?, ?);"
+
+
+def test_batch_insert_counts_inserted_and_skipped(conn):
+    rows = [("a", None), ("b", None), ("a", None)]
+
+    result = db._batch_insert_per_row(conn, SQL_INSERT_ITEMS, rows)
+
+    assert result == {"inserted": 2, "skipped": 1, "failed": 0}
+    assert conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 2
+
+
+def test_batch_insert_isolates_failing_rows(conn, monkeypatch):
+    monkeypatch.setattr(db, "BATCH_CHUNK_SIZE", 4)
+    # FK violations are not swallowed by OR IGNORE, so these rows fail
+    rows = [(f"c{i}", 999 if i in (3, 6) else None) for i in range(10)]
+
+    result = db._batch_insert_per_row(conn, SQL_INSERT_ITEMS, rows)
+
+    assert result == {"inserted": 8, "skipped": 0, "failed": 2}
+    codes = {r[0] for r in conn.execute("SELECT code FROM items")}
+    assert codes == {f"c{i}" for i in range(10) if i not in (3, 6)}
+
+
+def test_batch_insert_accepts_generator(conn):
+    rows = ((f"g{i}", None) for i in range(1200))
+
+    result = db._batch_insert_per_row(conn, SQL_INSERT_ITEMS, rows)
+
+    assert result["inserted"] == 1200
+
+
+def test_batch_insert_multi_values_spans_statements_and_falls_back(conn, monkeypatch):
+    monkeypatch.setattr(db, "SQLITE_MAX_VARIABLES", 6)  # 3 rows per statement
+    head = "INSERT OR IGNORE INTO items (code, parent_id)"
+    rows = [(f"m{i}", None) for i in range(7)] + [("m0", None)]
+
+    assert db._batch_insert_multi_values(conn, head, 2, SQL_INSERT_ITEMS, rows) == {
+        "inserted": 7, "skipped": 1, "failed": 0}
+
+    bad = [("n1", None), ("n2", 999), ("n3", None), ("n4", None)]
+    assert db._batch_insert_multi_values(conn, head, 2, SQL_INSERT_ITEMS, bad) == {
+        "inserted": 3, "skipped": 0, "failed": 1}
+    assert conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 10
+
+
+def test_batch_insert_staged_falls_back_per_row_when_merge_fails(conn):
+    rows = [("s1", None), ("s2", 999), ("s3", None), ("s1", None)]
+
+    result = db._batch_insert_staged(
+        conn, "items", ("code", "parent_id"), SQL_INSERT_ITEMS, rows)
+
+    assert result == {"inserted": 2, "skipped": 1, "failed": 1}
+    assert [r[0] for r in conn.execute("SELECT code FROM items ORDER BY id")] == ["s1", "s3"]
+
+
+def test_existing_ids_checks_membership_in_chunks(users_conn, monkeypatch):
+    monkeypatch.setattr(db, "LOOKUP_CHUNK_SIZE", 7)
+
+    found = db._existing_ids(users_conn, "users", "id", [1, 2, 2, None, 10**6, 1500])
+
+    assert found == {1, 2, 1500}
+
+
+def test_existing_ids_rejects_unsafe_identifiers(users_conn):
+    with pytest.raises(ValueError):
+        db._existing_ids(users_conn, "users; DROP TABLE users", "id", [1])
+    assert db._in_lookup_sql("users", "id", 2) is db._in_lookup_sql("users", "id", 2)
+
+
+def test_configure_bulk_load_switches_to_wal_once(tmp_path):
+    con = sqlite3.connect(str(tmp_path / "bulk.sqlite"))
+    try:
+        db.configure_bulk_load(con)
+        db.configure_bulk_load(con)
+        assert con.execute("PRAGMA journal_mode;").fetchone()[0] == "wal"
+        assert con.execute("PRAGMA synchronous;").fetchone()[0] == 1  # NORMAL
+        assert con.execute("PRAGMA busy_timeout;").fetchone()[0] == 5000
+
+        db.restore_durability(con)
+        assert con.execute("PRAGMA synchronous;").fetchone()[0] == 2  # FULL
+        db.configure_bulk_load(con)
+        assert con.execute("PRAGMA synchronous;").fetchone()[0] == 1
+    finally:
+        con.close()
+
+
+def test_configure_bulk_load_sync_off_is_opt_in(tmp_path, monkeypatch):
+    monkeypatch.setenv(db.BULK_SYNC_OFF_ENV, "1")
+    con = sqlite3.connect(str(tmp_path / "bulk.sqlite"))
+    try:
+        db.configure_bulk_load(con)
+        assert con.execute("PRAGMA synchronous;").fetchone()[0] == 0  # OFF
+        db.restore_durability(con)
+        assert con.execute("PRAGMA synchronous;").fetchone()[0] == 2
+    finally:
+        con.close()
+
+
+def test_calculate_duration_parses_iso_timestamps():
+    assert db.calculate_duration("2024-01-01T10:00:00Z", "2024-01-01T11:30:59Z") == 90
+    assert db.calculate_duration("2024-01-01T10:00:00+01:00", "2024-01-01T10:00:00Z") == 60
+    assert db.calculate_duration("not a date", "2024-01-01T10:00:00Z") is None
+    assert db.calculate_duration(None, "2024-01-01T10:00:00Z") is None
+    assert db.calculate_duration("2024-01-01T10:00:00", "2024-01-01T10:45:00Z") == 45
+
+
+@pytest.fixture
+def users_conn():
+    con = sqlite3.connect(":memory:")
+    con.execute("""
+    CREATE TABLE users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT NOT NULL,
+        email TEXT NOT NULL UNIQUE
+    );
+    """)
+    con.executemany(
+        "INSERT INTO users (username, email) VALUES (?, ?);",
+        [(f"User{i}", f"User{i}@Example.com") for i in range(1500)],
+    )
+    con.commit()
+    yield con
+    con.close()
+
+
+def test_map_usernames_handles_more_keys_than_sqlite_variable_limit(users_conn):
+    names = {f"user{i}" for i in range(1500)} | {"nobody"}
+
+    result = db._map_usernames_to_user_ids(users_conn, names)
+
+    assert len(result) == 1500
+    assert result["user0"] == 1
+    assert "nobody" not in result
+
+
+def test_map_usernames_picks_lowest_id_for_case_variants(users_conn):
+    users_conn.executemany(
+        "INSERT INTO users (username, email) VALUES (?, ?);",
+        [("USER0", "upper@example.com"), ("user0", "lower@example.com")],
+    )
+
+    assert db._map_usernames_to_user_ids(users_conn, {"user0"}) == {"user0": 1}
+    # lookups zelf maken geen schema-objecten aan
+    assert users_conn.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'index' AND name LIKE 'ix_users_%'"
+    ).fetchone()[0] == 0
+
+
+def test_map_emails_is_case_insensitive_and_keyed_by_input(users_conn):
+    emails = {f"user{i}@example.com" for i in range(1200)}
+
+    result = db.map_emails_to_db_user_ids(users_conn, emails)
+
+    assert len(result) == 1200
+    assert result["user7@example.com"] == 8
+
+
+def test_normalize_rows_orders_fields_and_converts_bool_columns():
+    rows = [{"email": "a@b.nl", "active": True, "name": "A"}, {"active": False}]
+
+    assert db._normalize_rows(rows, ("name", "email", "active")) == [
+        ("A", "a@b.nl", 1),
+        (None, None, 0),
+    ]
+    complete = [{"name": "B", "email": "b@b.nl", "active": True, "extra": 1}]
+    assert db._normalize_rows(complete, ("name", "email", "active")) == [("B", "b@b.nl", 1)]
+    assert db._normalize_rows(complete, ("name",)) == [("B",)]
+
+
+def test_alias_csv_readers(tmp_path):
+    path = tmp_path / "aliases.csv"
+    path.write_text(
+        "alias_username,canonical_username,alias_id,canonical_id,note\n"
+        "Jan2,Jan,7,3,duplicate email\n"
+        "piet_b,Piet,9,,duplicate email\n"
+        ",Nobody,1,1,\n",
+        encoding="utf-8",
+    )
+
+    assert db.read_user_alias_csv(str(path)) == {
+        "jan2": {"username": "jan", "canonical_id": 3},
+        "piet_b": {"username": "piet", "canonical_id": None},
+    }
+    assert db.load_alias_map_from_csv(str(path)) == {"jan2": "Jan", "piet_b": "Piet"}
+    assert db.read_user_alias_csv(str(tmp_path / "missing.csv")) == {}
+
+
+def test_read_user_alias_csv_is_cached_until_file_changes(tmp_path):
+    path = tmp_path / "aliases.csv"
+    path.write_text("alias_username,canonical_username\nJan2,Jan\n", encoding="utf-8")
+
+    first = db.read_user_alias_csv(str(path))
+    assert db.read_user_alias_csv(str(path)) is first
+
+    path.write_text("alias_username,canonical_username\nJan2,Jan\nKees1,Kees\n", encoding="utf-8")
+    assert set(db.read_user_alias_csv(str(path))) == {"jan2", "kees1"}
+
+
+@pytest.fixture
+def schema_conn(tmp_path):
+    path = str(tmp_path / "MobyPark.test.db")
+    create_database(path)
+    con = sqlite3.connect(path)
+    con.execute(
+        "INSERT INTO users (username, password, name, email, phone, role, created_at, birth_year, active) "
+        "VALUES ('jan', 'x', 'Jan', 'jan@example.com', '0612345678', 'USER', '2024-01-01', 1990, 1);"
+    )
+    con.execute(
+        "INSERT INTO parking_lots (name, location, address, capacity, reserved, tariff, daytariff, created_at, lat, lng) "
+        "VALUES ('P1', 'Centrum', 'Straat 1', 10, 0, 2.5, 20, '2024-01-01', 52.0, 4.0);"
+    )
+    con.execute(
+        "INSERT INTO sessions (parking_lot_id, user_id, started, duration_minutes, payment_status) "
+        "VALUES (1, 1, '2024-01-01T10:00:00Z', 60, 'paid');"
+    )
+    con.commit()
+    yield con
+    con.close()
+
+
+def _payment(tx, initiator):
+    return {
+        "transaction": tx,
+        "amount": "2.50",
+        "initiator": initiator,
+        "session_id": "1",
+        "parking_lot_id": 1,
+        "created_at": "01-01-2024 11:00:00",
+        "completed": "true",
+        "hash": "abc",
+        "t_data": {"date": "2024-01-01", "method": "ideal", "issuer": "X", "bank": "B"},
+    }
+
+
+def test_insert_payments_resolves_usernames_and_reports_unresolved(schema_conn, capsys):
+    rows = [_payment("tx1", "JAN"), _payment("tx1", "jan"), _payment("tx2", "ghost")]
+
+    result = db.insert_payments(schema_conn, rows, debug=True)
+
+    assert result == {"inserted": 1, "failed": 1, "duplicates": 1}
+    assert schema_conn.execute("SELECT user_id, completed FROM payments").fetchall() == [(1, 1)]
+    assert "['ghost']" in capsys.readouterr().out
+
+
+def test_insert_payments_rejects_unknown_foreign_keys_up_front(schema_conn):
+    bad = _payment("tx9", "jan")
+    bad["session_id"] = 999  # unknown session -> counted as failed before the insert
+
+    result = db.insert_payments(schema_conn, [_payment("tx1", "jan"), bad, _payment("tx2", "jan")])
+
+    assert result == {"inserted": 2, "failed": 1, "duplicates": 0}
+    txs = [r[0] for r in schema_conn.execute("SELECT transaction_id FROM payments ORDER BY payment_id")]
+    assert txs == ["tx1", "tx2"]
+
+
+def test_insert_payments_keeps_first_of_in_batch_duplicates(schema_conn):
+    first, again = _payment("tx1", "jan"), _payment("tx1", "jan")
+    again["amount"] = "9.99"
+
+    assert db.insert_payments(schema_conn, [first, again]) == {
+        "inserted": 1, "failed": 0, "duplicates": 1}
+    # a later batch repeating tx1 is still caught by the UNIQUE index
+    assert db.insert_payments(schema_conn, [_payment("tx1", "jan")]) == {
+        "inserted": 0, "failed": 0, "duplicates": 1}
+    assert schema_conn.execute("SELECT amount FROM payments").fetchall() == [(2.5,)]
+
+
+def test_insert_payments_dedupes_after_the_foreign_key_check(schema_conn):
+    orphan, valid = _payment("tx1", "jan"), _payment("tx1", "jan")
+    orphan["session_id"] = 999  # first row for tx1 fails the FK check
+
+    assert db.insert_payments(schema_conn, [orphan, valid]) == {
+        "inserted": 1, "failed": 1, "duplicates": 0}
+    assert schema_conn.execute("SELECT transaction_id, session_id FROM payments").fetchall() == [
+        ("tx1", 1)]
+
+
+def test_username_lookups_use_the_run_scoped_cache(schema_conn):
+    queries = []
+    schema_conn.set_trace_callback(
+        lambda sql: queries.append(sql) if "FROM users" in sql else None)
+    cache = {}
+
+    assert db._map_usernames_to_user_ids(schema_conn, {"JAN", "ghost"}, cache) == {"jan": 1}
+    assert db._map_usernames_to_user_ids(schema_conn, {"jan"}, cache) == {"jan": 1}
+    assert len(queries) == 1  # second batch is served from the cache
+    db._map_usernames_to_user_ids(schema_conn, {"jan", "ghost"}, cache)
+    assert len(queries) == 2  # misses are never cached
+
+    # without a cache (a new run) the DB is always asked again
+    schema_conn.execute("DELETE FROM users;")
+    assert db._map_usernames_to_user_ids(schema_conn, {"jan"}) == {}
+    assert cache == {"jan": 1}
+
+
+def test_insert_payments_counts_rows_without_transaction_as_failed(schema_conn):
+    no_tx = _payment("tx9", "jan")
+    del no_tx["transaction"]  # key absent altogether, not just None
+
+    result = db.insert_payments(schema_conn, [no_tx, _payment("tx1", "jan")])
+
+    assert result == {"inserted": 1, "failed": 1, "duplicates": 0}
+
+
+def test_normalize_payment_rows_simple_keeps_zero_amount():
+    rows = [
+        {"transaction": "tx1", "amount": 0, "t_data": {"amount": 5}, "username": "Jan",
+         "session_id": 1, "parking_lot_id": 1},
+        {"transaction_id": "tx2", "t_data": {"amount": "3.5"}, "user_id": "2",
+         "session_id": 1, "parking_lot_id": 1},
+    ]
+
+    out, missing = db.normalize_payment_rows_simple(rows, username_to_id={"jan": 1})
+
+    assert missing == 0
+    assert [(r["transaction_id"], r["amount"], r["user_id"]) for r in out] == [
+        ("tx1", 0.0, 1),
+        ("tx2", 3.5, 2),
+    ]
+
+
+def test_normalize_payment_rows_simple_skips_blank_values():
+    rows = [
+        {"transaction_id": " ", "transaction": "tx1", "amount": "  ", "t_data": {"amount": "4", "date": " "},
+         "username": "  ", "user": "Jan", "created_at": "2024-01-01", "hash": "h",
+         "session_id": 1, "parking_lot_id": 1},
+        {"transaction_id": " ", "amount": 1, "user_id": 1, "created_at": 0, "hash": "h",
+         "session_id": 1, "parking_lot_id": 1},
+    ]
+
+    out, missing = db.normalize_payment_rows_simple(rows, username_to_id={"jan": 1})
+
+    assert missing == 1
+    assert [(r["transaction_id"], r["amount"], r["user_id"], r["t_date"]) for r in out] == [
+        ("tx1", 4.0, 1, None),
+    ]
+    # 0 is een waarde, geen lege string
+    out, _ = db.normalize_payment_rows_simple(
+        [dict(rows[1], transaction_id="tx2")], username_to_id={})
+    assert out[0]["created_at"] == 0
+
+
+def test_insert_payments_skips_blank_initiator_and_amount(schema_conn):
+    row = _payment("tx1", "  ")
+    row.update(username="jan", amount="  ")
+    row["t_data"] = dict(row["t_data"], amount="3.5")
+
+    result = db.insert_payments(schema_conn, [row])
+
+    assert result == {"inserted": 1, "failed": 0, "duplicates": 0}
+    assert schema_conn.execute("SELECT user_id, amount FROM payments").fetchall() == [(1, 3.5)]
+
+
+def test_require_fields_splits_complete_rows(capsys):
+    rows = [{"a": 1, "b": 2}, {"a": 1, "b": None}, {"b": 2}]
+
+    ok, missing = db._require_fields(rows, ("a", "b"), debug=True, debug_limit=1)
+
+    assert ok == [rows[0]]
+    assert missing == 2
+    out = capsys.readouterr().out
+    assert out.count("[REQUIRE]") == 1 and "['b']" in out
+
+
+def test_dedupe_parking_lots_repoints_children(schema_conn):
+    schema_conn.execute(
+        "INSERT INTO parking_lots (name, location, address, capacity, reserved, tariff, daytariff, created_at, lat, lng) "
+        "VALUES (' p1 ', 'Centrum', 'STRAAT 1', 10, 0, 2.5, 20, '2024-01-01', 52.0, 4.0);"
+    )
+    schema_conn.execute("UPDATE sessions SET parking_lot_id = 2;")
+    schema_conn.commit()
+
+    db._dedupe_parking_lots(schema_conn, debug=False)
+
+    assert [r[0] for r in schema_conn.execute("SELECT id FROM parking_lots")] == [1]
+    assert schema_conn.execute("SELECT parking_lot_id FROM sessions").fetchone()[0] == 1
+
+
+def test_dedupe_parking_lots_merges_colliding_sessions(schema_conn):
+    schema_conn.execute("PRAGMA foreign_keys = ON;")
+    schema_conn.execute(
+        "INSERT INTO parking_lots (name, location, address, capacity, reserved, tariff, daytariff, created_at, lat, lng) "
+        "VALUES (' p1 ', 'Centrum', 'STRAAT 1', 10, 0, 2.5, 20, '2024-01-01', 52.0, 4.0);"
+    )
+    # zelfde user + started als sessie 1, maar op de duplicaat-lot
+    schema_conn.execute(
+        "INSERT INTO sessions (parking_lot_id, user_id, started, duration_minutes, payment_status) "
+        "VALUES (2, 1, '2024-01-01T10:00:00Z', 60, 'paid');"
+    )
+    schema_conn.execute(
+        "INSERT INTO payments (transaction_id, amount, user_id, session_id, parking_lot_id, created_at, "
+        "completed, hash, t_date, t_method, t_issuer, t_bank) "
+        "VALUES ('tx1', 2.5, 1, 2, 2, '2024-01-01', 1, 'h', '2024-01-01', 'ideal', 'x', 'y');"
+    )
+    schema_conn.commit()
+
+    db._dedupe_parking_lots(schema_conn, debug=False)
+
+    assert schema_conn.execute("SELECT session_id, parking_lot_id FROM sessions").fetchall() == [(1, 1)]
+    assert schema_conn.execute(
+        "SELECT transaction_id, session_id, parking_lot_id FROM payments"
+    ).fetchall() == [("tx1", 1, 1)]
+
+
+@pytest.mark.parametrize("streaming", [True, False])
+def test_iter_json_records_reads_list_and_dict_files(tmp_path, monkeypatch, streaming):
+    if not streaming:
+        monkeypatch.setattr(db, "ijson", None)
+    elif db.ijson is None:
+        pytest.skip("ijson not installed")
+    as_list = tmp_path / "list.json"
+    as_list.write_text('[{"id": 1, "tariff": 2.5}, {"id": 2}]', encoding="utf-8")
+    as_dict = tmp_path / "dict.json"
+    as_dict.write_text('{"1": {"id": 1, "tariff": 2.5}, "2": {"id": 2}}', encoding="utf-8")
+
+    expected = [{"id": 1, "tariff": 2.5}, {"id": 2}]
+    assert list(db.iter_json_records(str(as_list))) == expected
+    assert list(db.iter_json_records(str(as_dict))) == expected
+    assert list(db.iter_json_records(str(tmp_path / "missing.json"))) == []
+
+
+def test_extract_userid_to_email_accepts_generators():
+    users = ({"id": i, "email": f" u{i}@x.nl "} for i in (1, 2))
+
+    assert db.extract_userid_to_email(users) == {1: "u1@x.nl", 2: "u2@x.nl"}
+
+
+def test_insert_parking_lots_flattens_coordinates(schema_conn):
+    lots = {
+        "2": {"name": "P2", "location": "Oost", "address": "Laan 2", "capacity": "50",
+              "reserved": 0, "tariff": "1.5", "daytariff": 10, "created_at": "2024-01-01",
+              "coordinates": {"lat": 52.1, "lng": "4.3"}},
+        "3": {"name": "P3", "location": "West", "address": "Laan 3"},
+    }
+
+    result = db.insert_parking_lots(schema_conn, lots)
+
+    assert result == {"inserted": 1, "skipped": 0, "failed": 1}
+    row = schema_conn.execute(
+        "SELECT capacity, tariff, lat, lng FROM parking_lots WHERE name = 'P2'"
+    ).fetchone()
+    assert row == (50, 1.5, 52.1, 4.3)
+
+    again = {"4": dict(lots["2"], name="p2", address="LAAN 2"),
+             "5": dict(lots["2"], name="P5", address="Laan 5")}
+    assert db.insert_parking_lots(schema_conn, again) == {"inserted": 1, "skipped": 1, "failed": 0}
+
+
+def test_insert_users_and_vehicles_normalize_in_one_pass(schema_conn, monkeypatch):
+    monkeypatch.setattr(db, "build_aliases_from_user_json", lambda *a, **k: {})
+    users = {
+        "2": {"username": "piet", "password": "x", "name": "Piet", "email": "piet@example.com",
+              "phone": "06", "role": "", "created_at": "2024-01-01", "birth_year": "1985",
+              "active": False},
+        "3": {"username": "kees", "password": "x", "name": "Kees", "email": "kees@example.com",
+              "phone": "06", "created_at": "2024-01-01", "birth_year": 1990},  # no 'active'
+    }
+    vehicles = [
+        {"license_plate": "AB-123-C", "make": "VW", "model": "Golf", "color": "blue",
+         "year": "2020", "created_at": "2024-01-01"},
+        {"license_plate": "XY-999-Z", "make": "VW", "model": "Polo", "color": "red",
+         "created_at": "2024-01-01"},  # no 'year'
+    ]
+
+    assert db.insert_users(schema_conn, users) == {"inserted": 1, "skipped": 0, "failed": 1}
+    assert db.insert_vehicles(schema_conn, vehicles) == {"inserted": 1, "skipped": 0, "failed": 1}
+    assert schema_conn.execute(
+        "SELECT role, birth_year, active FROM users WHERE username = 'piet'"
+    ).fetchone() == ("USER", 1985, 0)
+    assert schema_conn.execute("SELECT year FROM vehicles").fetchall() == [(2020,)]
+
+
+def test_insert_users_keeps_json_order_for_large_batches(schema_conn, monkeypatch):
+    monkeypatch.setattr(db, "build_aliases_from_user_json", lambda *a, **k: {})
+    monkeypatch.setattr(db, "SORT_FOR_INDEX_MIN_ROWS", 1)
+    users = [
+        {"username": u, "password": "x", "name": u, "email": f"{u}@example.com",
+         "phone": "06", "created_at": "2024-01-01", "birth_year": 1990, "active": True}
+        for u in ("zoe", "anna", "mila")
+    ]
+
+    db.insert_users(schema_conn, users)
+
+    # ids follow the JSON order (after the fixture's 'jan'), not the email order
+    assert schema_conn.execute("SELECT username FROM users ORDER BY id").fetchall() == [
+        ("jan",), ("zoe",), ("anna",), ("mila",)]
+
+
+def test_insert_reservations_remaps_user_ids_by_email(schema_conn):
+    schema_conn.execute(
+        "INSERT INTO vehicles (license_plate, make, model, color, year, created_at) "
+        "VALUES ('AB-123-C', 'VW', 'Golf', 'blue', 2020, '2024-01-01');"
+    )
+    schema_conn.commit()
+    users_json = [{"id": 42, "email": "jan@example.com"}]
+    rows = [
+        {"id": 1, "user_id": 42, "parking_lot_id": 1, "vehicle_id": 1,
+         "start_time": "2024-01-01T10:00:00Z", "end_time": "2024-01-01T12:00:00Z",
+         "status": "confirmed", "created_at": "2024-01-01"},
+        {"id": 2, "user_id": 7, "parking_lot_id": 1, "vehicle_id": 1,
+         "start_time": "2024-01-01T10:00:00Z", "duration": 30,
+         "status": "confirmed", "created_at": "2024-01-01"},
+    ]
+
+    result = db.insert_reservations(schema_conn, rows, users_source=users_json)
+
+    assert result["inserted"] == 1
+    assert schema_conn.execute("SELECT user_id, duration FROM reservations").fetchall() == [(1, 120)]
+
+
+def test_normalize_reservation_rows_resolves_aliases_by_priority():
+    rows = [
+        {"id": "1", "startTime": "2024-01-01T09:00:00Z", "start_time": "2024-01-01T10:00:00Z",
+         "endTime": "2024-01-01T11:30:00Z", "createdAt": "2024-01-01", "durationMinutes": ""},
+        {"id": 2, "start": "2024-01-01T10:00:00Z", "duration_minutes": "0"},
+    ]
+
+    out = db.normalize_reservation_rows(rows)
+
+    assert [(r["id"], r["start_time"], r["duration"], r["created_at"]) for r in out] == [
+        (1, "2024-01-01T10:00:00Z", 90, "2024-01-01"),
+        (2, "2024-01-01T10:00:00Z", 0, None),
+    ]
+
+
+@pytest.mark.parametrize(
+    "value, as_int, as_float",
+    [
+        (None, None, None),
+        ("", None, None),
+        ("  ", None, None),
+        (7, 7, 7.0),
+        (True, 1, 1.0),
+        (2.9, 2, 2.9),
+        (" 12 ", 12, 12.0),
+        ("12.5", 12, 12.5),
+        ("1e3", 1000, 1000.0),
+        ("abc", None, None),
+        (float("inf"), None, float("inf")),
+        ({}, None, None),
+    ],
+)
+def test_to_int_and_to_float(value, as_int, as_float):
+    assert db._to_int(value) == as_int
+    assert db._to_float(value) == as_float
+
+
+@pytest.mark.parametrize(
+    "value, coerced, normalized",
+    [
+        (True, 1, 1),
+        (False, 0, 0),
+        (None, 0, 0),
+        (0, 0, 0),
+        (2, 1, 1),
+        (0.0, 0, 0),
+        (" Yes ", 1, 1),
+        ("completed", 1, 1),
+        ("NO", 0, 0),
+        ("pending", 1, 0),
+        ({"x": 1}, 1, 0),
+    ],
+)
+def test_completed_coercion(value, coerced, normalized):
+    assert db._coerce_completed(value) == coerced
+    assert db._normalize_completed(value) == normalized
+
+
+def test_sort_by_unique_key_is_stable_and_skips_small_batches(monkeypatch):
+    small = [("b", 1), ("a", 2)]
+    db._sort_by_unique_key(small, 0)
+    assert small == [("b", 1), ("a", 2)]
+
+    monkeypatch.setattr(db, "SORT_FOR_INDEX_MIN_ROWS", 2)
+    data = [("b", 1), (None, 2), ("a", 3), ("b", 4), (5, 5)]
+    db._sort_by_unique_key(data, 0)
+    assert data == [(None, 2), (5, 5), ("a", 3), ("b", 1), ("b", 4)]
+
+
+def test_build_aliases_from_user_json_writes_sorted_aliases(tmp_path):
+    users = tmp_path / "users.json"
+    users.write_text(
+        '[{"id": 1, "username": "jan", "email": "jan@x.nl"},'
+        ' {"id": 2, "username": "Zjan", "email": "JAN@x.nl"},'
+        ' {"id": 3, "username": "ajan", "email": "jan@x.nl"},'
+        ' {"id": 4, "username": "piet", "email": "piet@x.nl"}]',
+        encoding="utf-8",
+    )
+    out = tmp_path / "aliases.csv"
+
+    summary = db.build_aliases_from_user_json(str(users), str(out))
+
+    assert summary["emails"] == 2 and summary["aliases_written"] == 2
+    assert out.read_text(encoding="utf-8").splitlines() == [
+        "alias_username,canonical_username,alias_id,canonical_id,note",
+        "ajan,jan,3,1,duplicate email",
+        "Zjan,jan,2,1,duplicate email",
+    ]
+
+
+def test_insert_parking_sessions_resolves_users_and_durations(schema_conn):
+    rows = {
+        "1": {"username": "JAN", "parking_lot_id": "1", "started": "2024-02-01T10:00:00Z",
+              "stopped": "2024-02-01T11:30:00Z", "payment_status": "paid"},
+        "2": {"user": "jan", "lot_id": 1, "start": "2024-02-02 09:00:00",
+              "duration_minutes": "15", "status": "pending"},
+        "3": {"username": "jan", "parking_lot_id": 1, "started": "2024-02-01T10:00:00Z",
+              "duration_minutes": 5, "payment_status": "paid"},
+        "4": {"username": "jan", "parking_lot_id": 1, "payment_status": "paid"},
+        "5": {"username": "jan", "parking_lot_id": 1, "started": "2024-02-03T08:00:00Z",
+              "stopped": "2024-02-03T08:00:00Z", "payment_status": 1},
+    }
+
+    result = db.insert_parking_sessions(schema_conn, rows)
+
+    assert result == {"inserted": 3, "skipped": 1, "failed": 1}
+    assert schema_conn.execute(
+        "SELECT user_id, started, duration_minutes, payment_status FROM sessions "
+        "WHERE session_id > 1 ORDER BY session_id"
+    ).fetchall() == [
+        (1, "2024-02-01T10:00:00Z", 90, "paid"),
+        (1, "2024-02-02T09:00:00Z", 15, "pending"),
+        (1, "2024-02-03T08:00:00Z", 0, "1"),
+    ]
+
+
+def test_sessions_and_reservations_drop_unknown_foreign_keys_before_sql(schema_conn, monkeypatch):
+    def no_fallback(*args, **kwargs):
+        raise AssertionError("FK failures should never reach the per-chunk route")
+
+    monkeypatch.setattr(db, "_insert_chunk", no_fallback)
+    sessions = [
+        {"username": "jan", "parking_lot_id": 99, "started": "2024-03-01T10:00:00Z",
+         "duration_minutes": 5, "payment_status": "paid"},
+        {"username": "jan", "parking_lot_id": 1, "started": "2024-03-01T10:00:00Z",
+         "duration_minutes": 5, "payment_status": "paid"},
+    ]
+    reservations = [
+        {"id": 1, "user_id": 1, "parking_lot_id": 1, "vehicle_id": 7,
+         "start_time": "2024-01-01T10:00:00Z", "duration": 30,
+         "status": "confirmed", "created_at": "2024-01-01"},
+    ]
+
+    assert db.insert_parking_sessions(schema_conn, sessions) == {
+        "inserted": 1, "skipped": 0, "failed": 1}
+    assert db.insert_reservations(schema_conn, reservations) == {
+        "inserted": 0, "skipped": 0, "failed": 1}
+
+
+@pytest.mark.parametrize("raw, iso", [
+    ("2024-01-01T10:00:00Z", "2024-01-01T10:00:00Z"),
+    (" 2024-01-01 10:00:00Z ", "2024-01-01T10:00:00Z"),
+    ("2024-01-01T10:00:00+02:00", "2024-01-01T08:00:00Z"),
+    ("2024-01-01T10:00:00.250000", "2024-01-01T10:00:00.250000Z"),
+    ("", None),
+    ("   ", None),
+    (None, None),
+])
+def test_lenient_parse_dt_and_iso_utc(raw, iso):
+    assert db._iso_utc(db._lenient_parse_dt(raw)) == iso
+
+
+def test_iso_utc_zero_pads_years_before_1000():
+    assert db._iso_utc(datetime(999, 1, 2, tzinfo=timezone.utc)) == "0999-01-02T00:00:00Z"
+    assert db._iso_utc(datetime(45, 1, 2, 3, 4, 5, 6, tzinfo=timezone.utc)) == "0045-01-02T03:04:05.000006Z"
+
+
+def test_parse_iso_cached_reuses_parsed_timestamps():
+    db._parse_iso_cached.cache_clear()
+
+    first = db._lenient_parse_dt("2024-03-01T08:00:00Z")
+    again = db._lenient_parse_dt("2024-03-01T08:00:00Z")
+
+    assert first is again
+    assert db._parse_iso_cached.cache_info().hits == 1
+
+
+def test_pick_skips_missing_and_blank_values():
+    row = {"username": "  ", "user": None, "user_name": "piet", "lot_id": 0}
+
+    assert db._pick(row, db._USERNAME_KEYS) == "piet"
+    assert db._pick(row, db._PARKING_LOT_KEYS) == 0
+    assert db._pick(row, db._STARTED_KEYS) is None
+
+
+def test_load_parking_sessions_reads_files_in_order_and_skips_missing(tmp_path, monkeypatch):
+    (tmp_path / "p1-sessions.json").write_text('{"1": {"id": 1}, "2": {"id": 2}}', encoding="utf-8")
+    (tmp_path / "p3-sessions.json").write_text('[{"id": 3}]', encoding="utf-8")
+    monkeypatch.setattr(db, "SESSION_FILE_PATTERN", str(tmp_path / "p{}-sessions.json"))
+
+    sessions = db.load_parking_sessions(max_files=5)
+
+    assert [s["id"] for s in sessions] == [1, 2, 3]
+
+
+def test_make_batches_streams_any_iterable():
+    source = (i for i in range(7))
+
+    assert list(db.make_batches(source, 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert list(db.make_batches([], 3)) == []
+
+
+def test_insert_parking_sessions_resolves_aliases_and_skips_unknown_users(schema_conn, monkeypatch):
+    monkeypatch.setattr(db, "read_user_alias_csv", lambda: {
+        "jantje": {"username": "jan", "canonical_id": 1},
+    })
+    rows = [
+        {"username": "Jantje", "parking_lot_id": 1, "started": "2024-05-01T10:00:00Z",
+         "duration_minutes": 30, "payment_status": "paid"},
+        {"username": "ghost", "parking_lot_id": 1, "started": "2024-05-01T11:00:00Z",
+         "duration_minutes": 30, "payment_status": "paid"},
+    ]
+
+    result = db.insert_parking_sessions(schema_conn, rows)
+
+    assert result == {"inserted": 1, "skipped": 0, "failed": 1}
+    assert schema_conn.execute(
+        "SELECT user_id FROM sessions WHERE started = '2024-05-01T10:00:00Z'"
+    ).fetchone()[0] == 1
+
+
+@pytest.mark.parametrize("name", ["items; DROP TABLE items", "items\n", ""])
+def test_wipe_table_rejects_invalid_table_names(conn, name):
+    with pytest.raises(ValueError):
+        db.wipe_table(conn, name)
+
+
+def test_wipe_table_clears_rows(conn):
+    conn.execute("INSERT INTO items (code) VALUES ('a');")
+
+    db.wipe_table(conn, "items")
+
+    assert conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 0
+
+
+def test_transaction_nests_as_savepoint(conn):
+    with db.transaction(conn):
+        conn.execute("INSERT INTO items (code) VALUES ('outer');")
+        with pytest.raises(RuntimeError):
+            with db.transaction(conn):
+                conn.execute("INSERT INTO items (code) VALUES ('inner');")
+                raise RuntimeError("boom")
+        assert conn.in_transaction
+
+    assert [r[0] for r in conn.execute("SELECT code FROM items")] == ["outer"]
+
+
+def test_load_and_insert_sessions_batched_commits_once(schema_conn, tmp_path, monkeypatch):
+    for i in (1, 2, 4):
+        (tmp_path / f"p{i}-sessions.json").write_text(
+            '{"1": {"username": "jan", "parking_lot_id": 1, "payment_status": "paid",'
+            f' "started": "2024-06-0{i}T10:00:00Z", "duration_minutes": 10}}}}',
+            encoding="utf-8",
+        )
+    monkeypatch.setattr(db, "SESSION_FILE_PATTERN", str(tmp_path / "p{}-sessions.json"))
+
+    result = db.load_and_insert_sessions_batched(schema_conn, max_files=5, files_per_batch=2)
+
+    assert result == {"inserted": 3, "skipped": 0, "failed": 0, "total_loaded": 3}
+    assert not schema_conn.in_transaction
+    assert schema_conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0] == 4
+
+
+def test_load_and_insert_sessions_batched_dedupes_without_index(schema_conn, tmp_path, monkeypatch):
+    row = ('"{n}": {{"username": "jan", "parking_lot_id": 1, "payment_status": "paid",'
+           ' "started": "{started}", "duration_minutes": 10}}')
+    files = {
+        1: ["2024-01-01T10:00:00Z", "2024-06-01T10:00:00Z"],  # first exists already
+        2: ["2024-06-01T10:00:00Z", "2024-06-02T10:00:00Z"],  # repeat from file 1
+    }
+    for i, starts in files.items():
+        body = ", ".join(row.format(n=n, started=st) for n, st in enumerate(starts))
+        (tmp_path / f"p{i}-sessions.json").write_text("{" + body + "}", encoding="utf-8")
+    monkeypatch.setattr(db, "SESSION_FILE_PATTERN", str(tmp_path / "p{}-sessions.json"))
+
+    result = db.load_and_insert_sessions_batched(schema_conn, max_files=3, files_per_batch=1)
+
+    assert result == {"inserted": 2, "skipped": 2, "failed": 0, "total_loaded": 4}
+    assert [r[0] for r in schema_conn.execute(
+        "SELECT started FROM sessions ORDER BY session_id")] == [
+        "2024-01-01T10:00:00Z", "2024-06-01T10:00:00Z", "2024-06-02T10:00:00Z"]
+    assert schema_conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'ux_sessions_unique'").fetchone()
+
+
+def test_load_and_insert_sessions_batched_keeps_import_with_preexisting_duplicates(
+        schema_conn, tmp_path, monkeypatch, capsys):
+    # tabel van vóór de unieke index: sessie 1 staat er twee keer in
+    schema_conn.execute(
+        "INSERT INTO sessions (parking_lot_id, user_id, started, duration_minutes, payment_status) "
+        "VALUES (1, 1, '2024-01-01T10:00:00Z', 60, 'paid');"
+    )
+    schema_conn.commit()
+    (tmp_path / "p1-sessions.json").write_text(
+        '{"1": {"username": "jan", "parking_lot_id": 1, "payment_status": "paid",'
+        ' "started": "2024-06-01T10:00:00Z", "duration_minutes": 10}}',
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(db, "SESSION_FILE_PATTERN", str(tmp_path / "p{}-sessions.json"))
+
+    result = db.load_and_insert_sessions_batched(schema_conn, max_files=2)
+
+    assert result == {"inserted": 1, "skipped": 0, "failed": 0, "total_loaded": 1}
+    assert schema_conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0] == 3
+    assert schema_conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'ux_sessions_unique'").fetchone() is None
+    assert "existing duplicate sessions" in capsys.readouterr().out
+
+
+def test_session_file_paths_lists_existing_files_in_numeric_order(tmp_path, monkeypatch):
+    for name in ("p10-sessions.json", "p2-sessions.json", "p3-other.json", "p40-sessions.json"):
+        (tmp_path / name).write_text("[]", encoding="utf-8")
+    monkeypatch.setattr(db, "SESSION_FILE_PATTERN", str(tmp_path / "p{}-sessions.json"))
+
+    paths = db._session_file_paths(1, 11)
+
+    assert paths == [str(tmp_path / "p2-sessions.json"), str(tmp_path / "p10-sessions.json")]
+    monkeypatch.setattr(db, "SESSION_FILE_PATTERN", str(tmp_path / "missing" / "p{}.json"))
+    assert db._session_file_paths(1, 11) == []
+
+
+def test_lenient_parse_dt_normalizes_datetimes_to_utc():
+    from datetime import datetime, timedelta, timezone
+
+    aware = datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+    assert db._lenient_parse_dt(aware) is aware
+    assert db._lenient_parse_dt(datetime(2024, 1, 1, 12, 0)) == aware
+    cet = datetime(2024, 1, 1, 13, 0, tzinfo=timezone(timedelta(hours=1)))
+    assert db._lenient_parse_dt(cet).tzinfo is timezone.utc
+    assert db._lenient_parse_dt(cet) == aware
@@ -7,6 +7,7 @@ import pytest
 
 from v1.session_calculator import (
     calculate_price,
+    calculate_price_dt,
     generate_payment_hash,
     generate_transaction_validation_hash,
     check_payment_amount,
@@ -49,6 +50,46 @@ class TestSessionCalculatorUnit:
         assert days == 3
         assert price == 20.0 * 3
 
+    def test_calculate_price_ignores_surrounding_whitespace(self):
+        pricing = {"tariff": 2.5, "daytariff": 20.0}
+        data = {"started": "01-01-2025 10:00:00 ", "stopped": " 01-01-2025 12:00:00"}
+
+        price, hours, days = calculate_price(pricing, "sid5", data)
+        assert hours == 2
+        assert days == 0
+        assert price == 5.0
+
+    def test_calculate_price_rejects_malformed_timestamp(self):
+        pricing = {"tariff": 2.5, "daytariff": 20.0}
+        data = {"started": "2025-01-01T10:00:00Z", "stopped": "01-01-2025 12:00:00"}
+
+        with pytest.raises(ValueError):
+            calculate_price(pricing, "sid6", data)
+
+    @pytest.mark.parametrize("started", ["01-01-2_24 10:00:00", "+1-01-2024 10:00:00", "01-01-2024 1 :00:00"])
+    def test_calculate_price_rejects_signs_underscores_and_spaces(self, started):
+        pricing = {"tariff": 2.5, "daytariff": 20.0}
+        data = {"started": started, "stopped": "01-01-2025 12:00:00"}
+
+        with pytest.raises(ValueError):
+            calculate_price(pricing, "sid6", data)
+
+    def test_calculate_price_dt_matches_string_wrapper(self):
+        pricing = {"tariff": 2.5, "daytariff": 20.0}
+        data = {"started": "01-01-2025 10:00:00", "stopped": "01-01-2025 13:10:00"}
+
+        started = datetime(2025, 1, 1, 10, 0, 0)
+        stopped = datetime(2025, 1, 1, 13, 10, 0)
+        assert calculate_price_dt(pricing, "sid7", started, stopped) == calculate_price(pricing, "sid7", data)
+
+    def test_calculate_price_dt_without_stop_runs_until_now(self):
+        pricing = {"tariff": 2.5, "daytariff": 20.0}
+        started = datetime.now()
+
+        price, hours, days = calculate_price_dt(pricing, "sid8", started)
+        assert price == 0
+        assert days == 0
+
     def test_generate_payment_hash(self):
         sid = "ABC123"
         data = {"licenseplate": "XYZ999"}